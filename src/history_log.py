@@ -0,0 +1,31 @@
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import orjson
+
+
+class HistoryLog:
+    """Append-only JSONL log of conversation turns for local recovery"""
+
+    def __init__(self, user_id: str, log_dir: str = "history"):
+        self.path = Path(log_dir) / f"{user_id}.jsonl"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "ab")
+
+    def append(self, role: str, content: str) -> None:
+        """Write a single message; each call costs O(1) bytes regardless of history length"""
+        self._file.write(orjson.dumps({"role": role, "content": content}) + b"\n")
+        self._file.flush()
+
+    def load(self, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """Stream the log back, keeping only the most recent `limit` messages"""
+        messages: deque = deque(maxlen=limit)
+        with open(self.path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    messages.append(orjson.loads(line))
+        return list(messages)
+
+    def close(self) -> None:
+        self._file.close()
@@ -1,8 +1,17 @@
+from __future__ import annotations
+
+import asyncio
 import logging
-from stats_tutor import StatsTutor
+import sys
+import threading
+from contextlib import aclosing
+from typing import TYPE_CHECKING, Optional
 from dotenv import load_dotenv
 from logger_config import setup_logger
 
+if TYPE_CHECKING:
+    from stats_tutor import StatsTutor
+
 load_dotenv()
 setup_logger()
 logger = logging.getLogger(__name__)
@@ -10,68 +19,135 @@ logger = logging.getLogger(__name__)
 USER_ID = "user_number_uno"
 
 
-def learning_mode(tutor: StatsTutor) -> None:
+async def ainput(prompt: str = "") -> str:
+    """
+    Read a line on a daemon thread so background tasks keep running while we wait.
+    asyncio.to_thread would use the default executor, which asyncio.run joins
+    on exit, so Ctrl-C would hang until the pending input() returned.
+    """
+    loop = asyncio.get_running_loop()
+    line: asyncio.Future[str] = loop.create_future()
+
+    def settle(result: str, error: Optional[Exception]) -> None:
+        # The wait may have been cancelled by Ctrl-C before the line arrived
+        if line.done():
+            return
+        if error:
+            line.set_exception(error)
+        else:
+            line.set_result(result)
+
+    def read() -> None:
+        try:
+            outcome = (input(prompt), None)
+        except Exception as e:  # EOFError on Ctrl-D
+            outcome = ("", e)
+        try:
+            loop.call_soon_threadsafe(settle, *outcome)
+        except RuntimeError:
+            pass  # The loop closed while this thread was blocked on stdin
+
+    threading.Thread(target=read, daemon=True).start()
+    return await line
+
+
+def write_stream(chunk: str) -> None:
+    sys.stdout.write(chunk)
+    sys.stdout.flush()
+
+
+async def learning_mode(tutor: StatsTutor) -> None:
     logger.info("Entering learning mode")
     print("\nEntering learning mode. Type 'exit' to close the session.")
+    tutor.restore_history(USER_ID)
 
     while True:
-        user_input = input("\nUser: ").strip()
+        user_input = (await ainput("\nUser: ")).strip()
 
         if user_input.lower() == "exit":
             logger.info("User exited learning mode")
+            await tutor.wait_for_pending_writes()
             break
 
         logger.info("Processing user input in learning mode")
-        response = tutor.handle_interaction(
+        print("\nTutor: ", end="")
+        async for chunk in tutor.handle_interaction_stream(
             user_input,
             user_id=USER_ID,
-        )
+        ):
+            write_stream(chunk)
+        print()
 
-        print("\nTutor:", response)
 
-
-def testing_mode(tutor: StatsTutor) -> None:
+async def testing_mode(tutor: StatsTutor) -> None:
     logger.info("Entering testing mode")
     print("\nEntering testing mode. Type 'exit' to close the session.")
 
     while True:
-        candidates = tutor.get_testing_candidates(USER_ID)
+        candidates = await tutor.get_testing_candidates(USER_ID)
 
         if not candidates:
             logger.info("No testing candidates found")
             print("\nNo concepts ready for testing right now. Exiting...")
             break
 
-        for candidate in candidates:
-            logger.info(f"Testing candidate concept: {candidate['id']}")
-            print(f"\nTesting topic: {candidate['memory']}")
-
-            question = tutor.generate_test_question(candidate)
-            print("\nTest Question:", question)
-
-            print("\nType your answer (or 'skip' to move to next topic):")
-            user_answer = input().strip()
-
-            if user_answer.lower() == "skip":
-                logger.info(f"User skipped question for concept: {candidate['id']}")
-                continue
-
-            logger.info(f"Evaluating user answer for concept: {candidate['id']}")
-            result = tutor.evaluate_answer(
-                memory_id=candidate["id"], user_answer=user_answer
-            )
-
-            print("\nFeedback:", result["feedback"])
-            print("Result:", "Correct! ✓" if result["is_correct"] else "Incorrect ✗")
+        async with aclosing(tutor.iter_test_questions(candidates)) as questions:
+            async for candidate, question in questions:
+                logger.info(f"Testing candidate concept: {candidate['id']}")
+                print(f"\nTesting topic: {candidate['memory']}")
+
+                tutor.begin_test(candidate, question)
+                print("\nTest Question:", question)
+
+                print("\nType your answer (or 'skip' to move to next topic):")
+                user_answer = (await ainput()).strip()
+
+                if user_answer.lower() == "exit":
+                    logger.info("User exited testing mode")
+                    return
+
+                if user_answer.lower() == "skip":
+                    logger.info(f"User skipped question for concept: {candidate['id']}")
+                    continue
+
+                logger.info(f"Evaluating user answer for concept: {candidate['id']}")
+                print("\nFeedback: ", end="")
+                result = await tutor.evaluate_answer(
+                    memory_id=candidate["id"],
+                    user_answer=user_answer,
+                    on_feedback=write_stream,
+                )
+                print()
+
+                if result["is_correct"] is None:
+                    print("Result: not graded")
+                else:
+                    print(
+                        "Result:",
+                        "Correct! ✓" if result["is_correct"] else "Incorrect ✗",
+                    )
 
         logger.info("Testing mode completed")
         print("\nTesting complete. Exiting...")
         break
 
 
+async def run(mode: str) -> None:
+    # Imported only once a mode needs it, since it pulls in openai, mem0 and pydantic
+    from stats_tutor import StatsTutor
+
+    tutor = StatsTutor()
+    try:
+        if mode == "learn":
+            await learning_mode(tutor)
+        else:
+            await testing_mode(tutor)
+    finally:
+        await tutor.close()
+
+
 if __name__ == "__main__":
     logger.info("Starting Statistics Tutor application")
-    tutor = StatsTutor()
 
     print("Welcome to the Statistics Tutor!")
 
@@ -85,9 +161,13 @@ if __name__ == "__main__":
             logger.warning(f"Invalid mode entered: {mode}")
             print("Invalid mode. Please enter 'learn', 'test', or 'quit'")
 
-    if mode == "learn":
-        learning_mode(tutor)
-    elif mode == "test":
-        testing_mode(tutor)
-    else:
+    if mode == "quit":
         logger.info("Application terminated by user")
+        sys.exit(0)
+
+    try:
+        asyncio.run(run(mode))
+    except (KeyboardInterrupt, EOFError):
+        # run() has already closed the tutor, flushing pending memory writes
+        logger.info("Application interrupted by user")
+        print()
@@ -1,30 +1,130 @@
+import asyncio
+import functools
 import os
 import logging
 from datetime import datetime
-from typing import List, Dict, Any
-import json
-from openai import OpenAI
+from collections import deque
+from itertools import islice
+from typing import (
+    List,
+    Dict,
+    Any,
+    AsyncIterator,
+    Callable,
+    Coroutine,
+    Deque,
+    Iterable,
+    Optional,
+    Set,
+    Tuple,
+)
+import httpx
+import jiter
+import orjson
+import tiktoken
+from openai import (
+    APIConnectionError,
+    AsyncOpenAI,
+    InternalServerError,
+    RateLimitError,
+)
 from openai.types.chat.chat_completion_message_param import ChatCompletionMessageParam
-from mem0 import MemoryClient
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 from test_tracker import TestTracker
+from history_log import HistoryLog
 from logger_config import setup_logger
 
 setup_logger()
 logger = logging.getLogger(__name__)
 
-
+# Recent messages (6 user/assistant turns) kept verbatim when older ones are
+# folded into the rolling summary. Every unsummarized message is sent to the
+# LLM, so a prompt carries between one and two windows of history.
+HISTORY_WINDOW = 12
+# Summarize early if the unsummarized history grows past this, even within the window
+HISTORY_TOKEN_BUDGET = 3000
+# Number of relevant long-term memories retrieved from Mem0 per tutor turn
+RECALL_LIMIT = 5
+# Recall runs before the tutor call, so a slow Mem0 search is skipped rather than awaited
+RECALL_TIMEOUT_SECONDS = 1.5
+# Output caps sized to the structured replies; generation time grows with output length
+TUTOR_MAX_TOKENS = 1000
+EVALUATION_MAX_TOKENS = 200
+QUESTION_MAX_TOKENS = 150
+# Questions are generated a few at a time so the first one arrives quickly
+# and nothing is generated for concepts the student never reaches
+QUESTION_CHUNK_SIZE = 4
+# Shown after a tutor reply that hit TUTOR_MAX_TOKENS
+_CUT_OFF_NOTICE = "\n[This response was cut off at the length limit.]"
+
+# System prompts are kept byte-identical across calls so the provider can cache the prefix;
+# anything that varies per call goes in the messages that follow.
+SYSTEM_PROMPT_TUTOR = (
+    "You are a knowledgeable Statistics 101 tutor helping a student learn statistics concepts. "
+    "Follow these guidelines:\n\n"
+    "1. Use simple, clear language suitable for beginners\n"
+    "2. Build upon previous explanations to reinforce learning\n"
+    "3. Break down complex concepts into digestible chunks\n"
+    "4. Use concrete, real-world examples to illustrate concepts\n"
+    "5. Check for understanding by asking reflective questions\n"
+    "6. Acknowledge and validate the student's current understanding\n"
+    "7. Correct misconceptions gently and constructively\n"
+    "8. Focus on core statistical intuition over formulas\n\n"
+    "Your goal is to help the student develop a strong foundational understanding of statistics."
+)
+SYSTEM_PROMPT_QUESTION = (
+    "You are a Statistics 101 tutor creating test questions. "
+    "Based on the previous interaction, generate a question that tests "
+    "understanding of the concept. Make it specific and practical."
+)
+SYSTEM_PROMPT_QUESTION_BATCH = (
+    "You are a Statistics 101 tutor creating test questions. "
+    "For each numbered concept in the context, generate one question that tests "
+    "understanding of that concept. Make each question specific and practical, "
+    "and return the questions in the same order as the concepts."
+)
+SYSTEM_PROMPT_EVAL = (
+    "You are a Statistics 101 tutor grading a student's answer to a test question. "
+    "Evaluate the answer given the conversation context and provide structured feedback."
+)
+SYSTEM_PROMPT_SUMMARY = (
+    "Summarize this tutoring conversation between a Statistics 101 tutor and a student. "
+    "Keep the concepts covered, the examples used and any misconceptions the student had. "
+    "Be concise."
+)
+
+
+# Every tutor request starts with exactly these messages. Per-session context
+# (summary, history, retrieved memories) is always appended after them.
+_TUTOR_PREFIX: Tuple[ChatCompletionMessageParam, ...] = (
+    {"role": "system", "content": SYSTEM_PROMPT_TUTOR},
+)
+
+
+# Strict JSON schemas require additionalProperties: false on every response model
 class TutorResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    # Generated first so a reply cut off at the token limit is still classified
+    is_testable_topic: bool = Field(
+        description="Whether the subject of the conversation is a testable topic in a standard statistics course"
+    )
     response: str = Field(description="The tutor's response to the student")
     reason: str = Field(
         description="Explanation of why this was classified as a testable topic or not"
     )
-    is_testable_topic: bool = Field(
-        description="Whether the subject of the conversation is a testable topic in a standard statistics course"
-    )
 
 
 class EvaluationResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    # Generated first so a reply cut off at the token limit still has a verdict
     is_correct: bool = Field(
         description="Whether the student's answer demonstrates understanding"
     )
@@ -33,183 +133,643 @@ class EvaluationResponse(BaseModel):
     )
 
 
+class QuestionBatchResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    questions: List[str] = Field(
+        description="One test question per concept, in the order the concepts were given"
+    )
+
+
+def _response_format(model: type[BaseModel]) -> Dict[str, Any]:
+    """Build a strict structured output response_format from a pydantic model"""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model.__name__,
+            "schema": model.model_json_schema(),
+            "strict": True,
+        },
+    }
+
+
+# Schemas are generated once at import rather than by the SDK on every request
+_TUTOR_RESPONSE_FORMAT = _response_format(TutorResponse)
+_EVALUATION_RESPONSE_FORMAT = _response_format(EvaluationResponse)
+_QUESTION_BATCH_RESPONSE_FORMAT = _response_format(QuestionBatchResponse)
+
+
+def _to_json(obj: Any) -> str:
+    """Pretty-print a JSON-compatible object for debug logging"""
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+
+
+def _partial_object(snapshot: str) -> Dict[str, Any]:
+    """
+    Parse an incomplete JSON completion. The snapshot is parsed in
+    trailing-strings mode so unfinished text surfaces as it streams in.
+    """
+    if not snapshot:
+        return {}
+    partial = jiter.from_json(snapshot.encode(), partial_mode="trailing-strings")
+    return partial if isinstance(partial, dict) else {}
+
+
+def _partial_field(snapshot: str, field: str) -> str:
+    """Read a string field out of an incomplete JSON completion"""
+    return _partial_object(snapshot).get(field, "")
+
+
+# Token counts are tracked incrementally so history length checks never re-tokenize the session
+@functools.cache
+def _encoding() -> Optional[tiktoken.Encoding]:
+    """
+    Load the tokenizer on first use rather than at import. tiktoken downloads
+    its BPE file the first time, so without network access counts are estimated.
+    """
+    try:
+        return tiktoken.encoding_for_model("gpt-4o-mini")
+    except Exception as e:
+        logger.warning("Could not load tiktoken encoding, estimating tokens: %s", e)
+        return None
+
+
+def _count_text_tokens(text: str) -> int:
+    encoding = _encoding()
+    # English text averages about four characters per token
+    return len(encoding.encode(text)) if encoding else len(text) // 4
+
+
+@functools.cache
+def _system_prompt_tokens() -> int:
+    return _count_text_tokens(SYSTEM_PROMPT_TUTOR)
+
+
+def _count_tokens(message: ChatCompletionMessageParam) -> int:
+    return _count_text_tokens(str(message.get("content", "")))
+
+
+def _format_transcript(messages: Iterable[ChatCompletionMessageParam]) -> str:
+    """Render chat messages as plain text for use inside another prompt"""
+    return "\n".join(
+        f"{msg['role']}: {msg.get('content', '')}"
+        for msg in messages
+        if msg["role"] != "system"
+    )
+
+
 class StatsTutor:
     def __init__(self):
         """Initialize the tutor with memory configuration"""
-        self.memory = MemoryClient(api_key=os.getenv("MEM0_API_KEY"))
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        from mem0 import AsyncMemoryClient
+
+        self.memory = AsyncMemoryClient(api_key=os.getenv("MEM0_API_KEY"))
+        # One pooled HTTP/2 client so successive LLM calls reuse a TLS session
+        self._http = httpx.AsyncClient(
+            http2=True,
+            timeout=30.0,
+            limits=httpx.Limits(max_keepalive_connections=50),
+        )
+        self.client = AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"), http_client=self._http
+        )
+        # Chat calls retry through _chat, so the SDK's own retries would only multiply attempts
+        self._chat_client = self.client.with_options(max_retries=0)
         self.app_id = "stats-101-tutor"
-        self.message_history: List[ChatCompletionMessageParam] = []
+        # Compaction folds the history back to HISTORY_WINDOW as soon as it fills,
+        # so maxlen only drops unsummarized messages if summarization keeps failing
+        self.message_history: Deque[ChatCompletionMessageParam] = deque(
+            maxlen=2 * HISTORY_WINDOW
+        )
+        # Rolling summary of turns that have been folded out of message_history
+        self._summary = ""
+        self._history_tokens = 0
+        self._history_logs: Dict[str, HistoryLog] = {}
         self.test_tracker = TestTracker()
+        # Memory writes run as background tasks so responses aren't blocked on Mem0
+        self._pending: Set[asyncio.Task] = set()
+        # Summarization also runs in the background; at most one at a time
+        self._compaction: Optional[asyncio.Task] = None
+
+    @retry(
+        wait=wait_random_exponential(multiplier=1, max=8),
+        stop=stop_after_attempt(4),
+        retry=retry_if_exception_type(
+            (RateLimitError, APIConnectionError, InternalServerError)
+        ),
+        reraise=True,
+    )
+    async def _chat(self, **kwargs: Any) -> Any:
+        """
+        Create a chat completion, retrying rate limits and transient server or
+        connection errors with jittered exponential backoff. Streaming calls are
+        retried only until the response starts.
+        """
+        return await self._chat_client.chat.completions.create(**kwargs)
 
-    def handle_interaction(self, user_input: str, user_id: str) -> str:
+    async def handle_interaction(self, user_input: str, user_id: str) -> str:
         """
         Generate a response to the user (student) as a tutor would,
         and updates the memory store as a side effect.
         """
-        logger.info(f"Processing user input: {user_input[:50]}...")
-
-        messages: List[ChatCompletionMessageParam] = [
-            {
-                "role": "system",
-                "content": (
-                    "You are a knowledgeable Statistics 101 tutor helping a student learn statistics concepts. "
-                    "Follow these guidelines:\n\n"
-                    "1. Use simple, clear language suitable for beginners\n"
-                    "2. Build upon previous explanations to reinforce learning\n"
-                    "3. Break down complex concepts into digestible chunks\n"
-                    "4. Use concrete, real-world examples to illustrate concepts\n"
-                    "5. Check for understanding by asking reflective questions\n"
-                    "6. Acknowledge and validate the student's current understanding\n"
-                    "7. Correct misconceptions gently and constructively\n"
-                    "8. Focus on core statistical intuition over formulas\n\n"
-                    "Your goal is to help the student develop a strong foundational understanding of statistics."
-                ),
-            }
-        ]
+        return "".join(
+            [
+                chunk
+                async for chunk in self.handle_interaction_stream(user_input, user_id)
+            ]
+        )
 
-        if self.message_history:
-            messages.extend(self.message_history)
+    async def handle_interaction_stream(
+        self, user_input: str, user_id: str
+    ) -> AsyncIterator[str]:
+        """
+        Streaming variant of handle_interaction that yields the tutor's
+        response text as it is generated. Side effects run once the stream completes.
+        """
+        logger.info(f"Processing user input: {user_input[:50]}...")
 
+        summary: List[ChatCompletionMessageParam] = (
+            [
+                {
+                    "role": "system",
+                    "content": f"Prior conversation summary: {self._summary}",
+                }
+            ]
+            if self._summary
+            else []
+        )
+        recalled = await self._recall(user_input, user_id)
+        messages: List[ChatCompletionMessageParam] = [*_TUTOR_PREFIX, *summary]
+        messages += self.message_history
+        messages += recalled
         messages.append({"role": "user", "content": user_input})
 
-        logger.debug(
-            "Sending request to OpenAI with messages (truncated): %s",
-            json.dumps(messages[-2:], indent=2),
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Sending request to OpenAI with messages (truncated): %s",
+                _to_json(messages[-2:]),
+            )
 
-        response = self.client.beta.chat.completions.parse(
+        stream = await self._chat(
             model="gpt-4o-mini",
             messages=messages,
             temperature=0,
-            response_format=TutorResponse,
+            max_tokens=TUTOR_MAX_TOKENS,
+            response_format=_TUTOR_RESPONSE_FORMAT,
+            stream=True,
         )
 
-        result = response.choices[0].message.parsed
+        content = ""
+        finish_reason = None
+        streamed = ""
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            finish_reason = choice.finish_reason or finish_reason
+            if not choice.delta.content:
+                continue
+            content += choice.delta.content
+            text = _partial_field(content, "response")
+            if len(text) > len(streamed):
+                yield text[len(streamed) :]
+                streamed = text
+
+        if finish_reason == "length":
+            # Keep what the student already saw; the classification came before the response
+            logger.warning("Tutor response was cut off at the token limit")
+            yield _CUT_OFF_NOTICE
+            response = streamed
+            is_testable_topic = (
+                _partial_object(content).get("is_testable_topic") is True
+            )
+        else:
+            if not content:
+                logger.warning("Received empty response from OpenAI")
+                return
 
-        if not result:
-            logger.warning("Received empty response from OpenAI")
-            return ""
+            result = TutorResponse.model_validate_json(content)
 
-        logger.debug(
-            "Received response from OpenAI: %s",
-            json.dumps(result.model_dump(), indent=2),
-        )
+            if len(result.response) > len(streamed):
+                yield result.response[len(streamed) :]
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Received response from OpenAI: %s",
+                    _to_json(result.model_dump()),
+                )
+            response = result.response
+            is_testable_topic = result.is_testable_topic
 
         # Update message history
-        self.message_history.append({"role": "user", "content": user_input})
-        self.message_history.append({"role": "assistant", "content": result.response})
+        self._record_turn(user_id, user_input, response)
 
-        # We need a copy because we need to modify the contents solely to tell Mem0 to add it to memory
-        if result.is_testable_topic:
+        # The IMPORTANT tag is only for Mem0, so it goes on separate messages rather than the history
+        if is_testable_topic:
             logger.info("Identified testable topic - storing in memory")
-            # Copy and modify messages for memory storage
+            # Only the latest exchange is sent; Mem0 extracts the new facts from that pair
             memory_messages = [
-                {"role": msg["role"], "content": msg.get("content", "")}
-                for msg in self.message_history
+                {
+                    "role": "user",
+                    "content": f"{user_input}\n[IMPORTANT: this is a testable topic and should be remembered]",
+                },
+                {"role": "assistant", "content": response},
             ]
-            last_user_msg = memory_messages[-2]["content"]
-            memory_messages[-2]["content"] = (
-                f"{last_user_msg}\n[IMPORTANT: this is a testable topic and should be remembered]"
+
+            self._submit_write(
+                self.memory.add(
+                    messages=memory_messages,
+                    user_id=user_id,
+                    app_id=self.app_id,
+                    metadata={
+                        "timestamp": datetime.now().isoformat(),
+                    },
+                )
             )
 
-            self.memory.add(
-                messages=memory_messages,
-                user_id=user_id,
-                app_id=self.app_id,
-                metadata={
-                    "timestamp": datetime.now().isoformat(),
-                },
+        self._schedule_compaction()
+
+    async def _recall(
+        self, user_input: str, user_id: str
+    ) -> List[ChatCompletionMessageParam]:
+        """
+        Retrieve memories relevant to the student's input from Mem0 so earlier
+        sessions inform the answer without replaying their full history. Returned
+        as a separate message placed after the history, leaving the prefix stable.
+        """
+        try:
+            memories = await asyncio.wait_for(
+                self.memory.search(
+                    user_input,
+                    version="v2",
+                    filters={"AND": [{"user_id": user_id}, {"app_id": self.app_id}]},
+                    top_k=RECALL_LIMIT,
+                ),
+                RECALL_TIMEOUT_SECONDS,
             )
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Memory recall timed out after %.1fs", RECALL_TIMEOUT_SECONDS
+            )
+            return []
+        except Exception as e:
+            # Recall only enriches the prompt, so a Mem0 failure shouldn't fail the turn
+            logger.warning("Memory recall failed: %s", e)
+            return []
+
+        if not memories:
+            return []
 
-        return result.response
+        facts = "\n".join(f"- {memory['memory']}" for memory in memories)
+        return [
+            {
+                "role": "user",
+                "content": f"Context: things I have learned in earlier sessions:\n{facts}",
+            }
+        ]
+
+    def _history_log(self, user_id: str) -> HistoryLog:
+        if user_id not in self._history_logs:
+            self._history_logs[user_id] = HistoryLog(user_id)
+        return self._history_logs[user_id]
+
+    def _record_turn(self, user_id: str, user_input: str, response: str) -> None:
+        """Add a learning turn to the in-memory history and the local history log"""
+        log = self._history_log(user_id)
+        for role, content in (("user", user_input), ("assistant", response)):
+            self._append_history({"role": role, "content": content})
+            log.append(role, content)
+
+    def restore_history(self, user_id: str) -> None:
+        """Resume the most recent turns of the user's previous learning session"""
+        messages = self._history_log(user_id).load(limit=HISTORY_WINDOW)
+        if messages:
+            logger.info(f"Restored {len(messages)} messages from the history log")
+            self._set_history(messages)
+
+    def _append_history(self, message: ChatCompletionMessageParam) -> None:
+        if len(self.message_history) == self.message_history.maxlen:
+            # The append below evicts the oldest message, so stop counting it
+            self._history_tokens -= _count_tokens(self.message_history[0])
+        self.message_history.append(message)
+        self._history_tokens += _count_tokens(message)
+
+    def _set_history(self, messages: Iterable[ChatCompletionMessageParam]) -> None:
+        self.message_history.clear()
+        self._history_tokens = 0
+        for message in messages:
+            self._append_history(message)
+
+    def _schedule_compaction(self) -> None:
+        """
+        Fold the oldest messages into the rolling summary once a full window
+        has accumulated beyond the verbatim window, so the summary is
+        regenerated every few turns rather than on every call. Long turns that
+        push the history over the token budget are folded sooner. The summary
+        is generated in the background so the student isn't kept waiting.
+        """
+        if self._compaction and not self._compaction.done():
+            return
+
+        if len(self.message_history) >= 2 * HISTORY_WINDOW:
+            keep = HISTORY_WINDOW
+        elif (
+            _system_prompt_tokens() + self._history_tokens > HISTORY_TOKEN_BUDGET
+            and len(self.message_history) > 2
+        ):
+            keep = 2
+        else:
+            return
+
+        self._compaction = asyncio.create_task(self._compact_history(keep))
+        self._compaction.add_done_callback(self._on_compaction_done)
+
+    def _on_compaction_done(self, task: asyncio.Task) -> None:
+        error = None if task.cancelled() else task.exception()
+        if error:
+            # The history is left intact, so compaction is simply retried after the next turn
+            logger.error("History compaction failed: %s", error)
+
+    async def _compact_history(self, keep: int) -> None:
+        older = list(islice(self.message_history, 0, len(self.message_history) - keep))
+        logger.info(f"Summarizing {len(older)} older messages")
+        transcript = _format_transcript(older)
+        if self._summary:
+            transcript = (
+                f"Existing summary:\n{self._summary}\n\nNew messages:\n{transcript}"
+            )
+
+        response = await self._chat(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT_SUMMARY},
+                {"role": "user", "content": transcript},
+            ],
+            temperature=0,
+        )
 
-    def get_testing_candidates(self, user_id: str) -> List[Dict]:
+        # Turns recorded meanwhile may have evicted some of the oldest messages,
+        # so drop only the summarized messages still at the front
+        folded = {id(message) for message in older}
+        if not self.message_history or id(self.message_history[0]) not in folded:
+            logger.info("History changed during compaction, discarding the summary")
+            return
+
+        self._summary = response.choices[0].message.content or self._summary
+        while self.message_history and id(self.message_history[0]) in folded:
+            self._history_tokens -= _count_tokens(self.message_history.popleft())
+
+    def _submit_write(self, write: Coroutine[Any, Any, Any]) -> None:
+        """Schedule a memory write as a background task"""
+        task = asyncio.create_task(write)
+        # Hold a reference until the task finishes so it isn't garbage collected
+        self._pending.add(task)
+        task.add_done_callback(self._on_write_done)
+
+    def _on_write_done(self, task: asyncio.Task) -> None:
+        self._pending.discard(task)
+        error = None if task.cancelled() else task.exception()
+        if error:
+            logger.error("Background memory write failed: %s", error)
+
+    async def wait_for_pending_writes(self) -> None:
+        """Wait until all scheduled memory writes have finished"""
+        if self._pending:
+            logger.info(f"Waiting for {len(self._pending)} pending memory writes")
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    async def close(self) -> None:
+        """Flush pending memory writes and release network clients"""
+        await self.wait_for_pending_writes()
+        # The summary only lives for this session, so an unfinished one isn't worth waiting for
+        if self._compaction and not self._compaction.done():
+            self._compaction.cancel()
+            await asyncio.gather(self._compaction, return_exceptions=True)
+        # The shared client carries every OpenAI connection
+        await self._http.aclose()
+        # Mem0 keeps its own clients: an async one for API calls and the sync one it wraps
+        await self.memory.async_client.aclose()
+        self.memory.sync_client.client.close()
+        self.test_tracker.close()
+        for log in self._history_logs.values():
+            log.close()
+
+    async def get_testing_candidates(self, user_id: str) -> List[Dict]:
         """Get concepts that are ready for testing based on conversation history"""
 
-        memories = self.memory.get_all(
-            filters={"user_id": user_id},
+        # Filter by app on the Mem0 side so only this tutor's memories are transferred
+        memories = await self.memory.get_all(
+            filters={"AND": [{"user_id": user_id}, {"app_id": self.app_id}]},
             version="v2",
         )
-        logger.debug("Retrieved memories: %s", json.dumps(memories, indent=2))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Retrieved memories: %s", _to_json(memories))
 
-        candidates = [
-            memory
-            for memory in memories
-            if self.test_tracker.is_ready_for_test(memory["id"])
-        ]
+        ready = self.test_tracker.filter_ready([memory["id"] for memory in memories])
+        candidates = [memory for memory in memories if memory["id"] in ready]
         logger.info(f"Found {len(candidates)} testing candidates")
         return candidates
 
-    def generate_test_question(self, candidate: Dict) -> str:
+    async def generate_test_question(self, candidate: Dict) -> str:
         """Generate a test question based on previous interactions"""
+        return "".join(
+            [chunk async for chunk in self.generate_test_question_stream(candidate)]
+        )
+
+    async def generate_test_question_stream(
+        self, candidate: Dict
+    ) -> AsyncIterator[str]:
+        """Streaming variant of generate_test_question that yields the question as it is generated"""
 
-        logger.debug("Using candidate: %s", json.dumps(candidate, indent=2))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Using candidate: %s", _to_json(candidate))
 
         messages: List[ChatCompletionMessageParam] = [
-            {
-                "role": "system",
-                "content": (
-                    "You are a Statistics 101 tutor creating test questions. "
-                    "Based on the previous interaction, generate a question that tests "
-                    "understanding of the concept. Make it specific and practical."
-                ),
-            },
-            {
-                "role": "user",
-                "content": f"Here's the concept to generate a question about:\n{candidate['memory']}",
-            },
+            {"role": "system", "content": SYSTEM_PROMPT_QUESTION},
+            {"role": "user", "content": f"Context:\n{candidate['memory']}"},
         ]
 
-        response = self.client.chat.completions.create(
+        stream = await self._chat(
             model="gpt-4o-mini",
             messages=messages,
             temperature=0,
+            # Questions are a single short paragraph; stop if the model starts padding
+            stop=["\n\n\n"],
+            stream=True,
         )
 
-        question = response.choices[0].message.content or ""
-        logger.debug("Generated question: %s", question)
+        chunks: List[str] = []
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                chunks.append(delta)
+                yield delta
 
-        self.message_history = messages
-        self.message_history.append({"role": "assistant", "content": question})
+        logger.debug("Generated question: %s", "".join(chunks))
 
-        return question
+    async def generate_test_questions_batch(self, candidates: List[Dict]) -> List[str]:
+        """Generate one test question per candidate in a single request"""
+        if not candidates:
+            return []
 
-    def evaluate_answer(self, memory_id: str, user_answer: str) -> Dict[str, Any]:
-        logger.info(f"Evaluating answer for memory_id: {memory_id}")
-        logger.debug(f"User answer: {user_answer}")
+        concepts = "\n".join(
+            f"{i}. {candidate['memory']}" for i, candidate in enumerate(candidates, 1)
+        )
+        messages: List[ChatCompletionMessageParam] = [
+            {"role": "system", "content": SYSTEM_PROMPT_QUESTION_BATCH},
+            {"role": "user", "content": f"Context:\n{concepts}"},
+        ]
 
-        self.message_history.extend(
+        response = await self._chat(
+            model="gpt-4o-mini",
+            messages=messages,
+            temperature=0,
+            max_tokens=QUESTION_MAX_TOKENS * len(candidates),
+            response_format=_QUESTION_BATCH_RESPONSE_FORMAT,
+        )
+
+        choice = response.choices[0]
+        questions = (
+            QuestionBatchResponse.model_validate_json(choice.message.content).questions
+            if choice.message.content and choice.finish_reason != "length"
+            else []
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Generated questions: %s", _to_json(questions))
+
+        if len(questions) < len(candidates):
+            logger.warning(
+                f"Expected {len(candidates)} questions but got {len(questions)}, generating the rest individually"
+            )
+            for candidate in candidates[len(questions) :]:
+                questions.append(await self.generate_test_question(candidate))
+
+        return questions[: len(candidates)]
+
+    async def iter_test_questions(
+        self, candidates: List[Dict]
+    ) -> AsyncIterator[Tuple[Dict, str]]:
+        """
+        Yield (candidate, question) pairs, generating questions in chunks of
+        QUESTION_CHUNK_SIZE. The next chunk is generated while the student
+        answers the current one. Close the iterator (e.g. with
+        contextlib.aclosing) to cancel generation when stopping early.
+        """
+        chunks = [
+            candidates[start : start + QUESTION_CHUNK_SIZE]
+            for start in range(0, len(candidates), QUESTION_CHUNK_SIZE)
+        ]
+        prefetch: Optional[asyncio.Task] = None
+        try:
+            for i, chunk in enumerate(chunks):
+                questions = await (
+                    prefetch or self.generate_test_questions_batch(chunk)
+                )
+                prefetch = None
+                if i + 1 < len(chunks):
+                    prefetch = asyncio.create_task(
+                        self.generate_test_questions_batch(chunks[i + 1])
+                    )
+                for pair in zip(chunk, questions):
+                    yield pair
+        finally:
+            if prefetch:
+                prefetch.cancel()
+                await asyncio.gather(prefetch, return_exceptions=True)
+
+    def begin_test(self, candidate: Dict, question: str) -> None:
+        """Set the question exchange that evaluate_answer grades the next answer against"""
+        self._set_history(
             [
-                {
-                    "role": "system",
-                    "content": "Ignore the previous system prompt. Updated Mission: Evaluate the answer given the conversation history and provide structured feedback.",
-                },
-                {
-                    "role": "user",
-                    "content": user_answer,
-                },
+                {"role": "system", "content": SYSTEM_PROMPT_QUESTION},
+                {"role": "user", "content": f"Context:\n{candidate['memory']}"},
+                {"role": "assistant", "content": question},
             ]
         )
-        response = self.client.beta.chat.completions.parse(
+        self._summary = ""
+
+    async def evaluate_answer(
+        self,
+        memory_id: str,
+        user_answer: str,
+        on_feedback: Optional[Callable[[str], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Grade the student's answer to the current test question. If on_feedback
+        is given, it is called with each new piece of feedback text as it streams in.
+        is_correct is None when no verdict could be read from the response.
+        """
+        logger.info(f"Evaluating answer for memory_id: {memory_id}")
+        logger.debug(f"User answer: {user_answer}")
+
+        # The question exchange from generate_test_question is passed as context
+        # rather than appended after a second system prompt
+        messages: List[ChatCompletionMessageParam] = [
+            {"role": "system", "content": SYSTEM_PROMPT_EVAL},
+            {
+                "role": "user",
+                "content": f"Context:\n{_format_transcript(self.message_history)}",
+            },
+            {"role": "user", "content": user_answer},
+        ]
+        stream = await self._chat(
             model="gpt-4o-mini",
-            messages=self.message_history,
-            response_format=EvaluationResponse,
+            messages=messages,
+            response_format=_EVALUATION_RESPONSE_FORMAT,
             temperature=0,
+            max_tokens=EVALUATION_MAX_TOKENS,
+            stream=True,
         )
 
-        result = response.choices[0].message.parsed
+        content = ""
+        finish_reason = None
+        streamed = ""
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            finish_reason = choice.finish_reason or finish_reason
+            if not choice.delta.content:
+                continue
+            content += choice.delta.content
+            if on_feedback is None:
+                continue
+            text = _partial_field(content, "feedback")
+            if len(text) > len(streamed):
+                on_feedback(text[len(streamed) :])
+                streamed = text
+
+        result = None
+        if finish_reason == "length":
+            logger.warning("Evaluation response was cut off at the token limit")
+            partial = _partial_object(content)
+            # The verdict is generated first, so it is usually complete even when the feedback isn't
+            if isinstance(partial.get("is_correct"), bool):
+                result = EvaluationResponse(
+                    is_correct=partial["is_correct"],
+                    feedback=partial.get("feedback", "") + _CUT_OFF_NOTICE,
+                )
+        elif content:
+            result = EvaluationResponse.model_validate_json(content)
 
         if not result:
             logger.warning("Received invalid evaluation response")
+            feedback = "The answer could not be graded."
+            if on_feedback:
+                on_feedback(feedback)
             return {
-                "is_correct": False,
-                "feedback": "The tutor's response was not valid.",
+                "is_correct": None,
+                "feedback": feedback,
             }
-        logger.debug(
-            "Received evaluation response: %s",
-            json.dumps(result.model_dump(), indent=2),
-        )
+
+        if on_feedback and len(result.feedback) > len(streamed):
+            on_feedback(result.feedback[len(streamed) :])
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Received evaluation response: %s",
+                _to_json(result.model_dump()),
+            )
         self.test_tracker.record_test(memory_id, result.is_correct)
         logger.info(
             f"Recorded test result for memory_id {memory_id}: {'correct' if result.is_correct else 'incorrect'}"
@@ -1,7 +1,12 @@
 import sqlite3
+import threading
+import time
 from pathlib import Path
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, List, Set, Tuple
+
+TEST_INTERVAL_SECONDS = 4 * 60 * 60  # Simple fixed interval for now
+# Stay well under SQLite's limit on bound parameters per statement
+_MAX_IN_PARAMS = 500
 
 
 class TestTracker:
@@ -9,57 +14,128 @@ class TestTracker:
 
     def __init__(self, db_path: str = "test_history.db"):
         self.db_path = db_path
+        # One autocommit connection for the tracker's lifetime instead of reopening the file per query
+        self._conn = sqlite3.connect(
+            db_path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.Lock()
         self._init_db()
 
     def _init_db(self) -> None:
         """Initialize SQLite database"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
+        with self._lock:
+            self._conn.execute("""
                 CREATE TABLE IF NOT EXISTS test_history (
                     memory_id TEXT PRIMARY KEY,
-                    last_tested TEXT,
+                    last_tested INTEGER,
                     correct_count INTEGER DEFAULT 0,
                     total_tests INTEGER DEFAULT 0
                 )
             """)
+            self._migrate_last_tested()
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_last_tested ON test_history(last_tested)"
+            )
+            # Memories currently due for a retest, for inspecting the schedule in SQL
+            self._conn.execute(f"""
+                CREATE VIEW IF NOT EXISTS ready_memories AS
+                SELECT memory_id FROM test_history
+                WHERE last_tested <= CAST(strftime('%s', 'now') AS INTEGER) - {TEST_INTERVAL_SECONDS}
+            """)
+
+    def _migrate_last_tested(self) -> None:
+        """Convert databases that stored last_tested as ISO text to unix seconds"""
+        columns = {
+            row["name"]: row["type"]
+            for row in self._conn.execute("PRAGMA table_info(test_history)")
+        }
+        if columns.get("last_tested") != "TEXT":
+            return
+
+        # A TEXT column would coerce integers back to strings, so rebuild the table.
+        # The stored timestamps are naive local times, hence the 'utc' modifier.
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute("ALTER TABLE test_history RENAME TO test_history_old")
+            self._conn.execute("""
+                CREATE TABLE test_history (
+                    memory_id TEXT PRIMARY KEY,
+                    last_tested INTEGER,
+                    correct_count INTEGER DEFAULT 0,
+                    total_tests INTEGER DEFAULT 0
+                )
+            """)
+            self._conn.execute("""
+                INSERT INTO test_history (memory_id, last_tested, correct_count, total_tests)
+                SELECT memory_id, CAST(strftime('%s', last_tested, 'utc') AS INTEGER),
+                       correct_count, total_tests
+                FROM test_history_old
+            """)
+            self._conn.execute("DROP TABLE test_history_old")
 
     def record_test(self, memory_id: str, is_correct: bool) -> None:
         """Record a test attempt"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
+        self.record_tests([(memory_id, is_correct)])
+
+    def record_tests(self, results: Iterable[Tuple[str, bool]]) -> None:
+        """Record many test attempts in a single transaction"""
+        timestamp = int(time.time())
+        rows = [
+            (memory_id, timestamp, 1 if is_correct else 0)
+            for memory_id, is_correct in results
+        ]
+        with self._lock, self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
                 """
                 INSERT INTO test_history (memory_id, last_tested, correct_count, total_tests)
                 VALUES (?, ?, ?, 1)
                 ON CONFLICT(memory_id) DO UPDATE SET
-                    last_tested = ?,
-                    correct_count = correct_count + ?,
+                    last_tested = excluded.last_tested,
+                    correct_count = correct_count + excluded.correct_count,
                     total_tests = total_tests + 1
             """,
-                (
-                    memory_id,
-                    datetime.now().isoformat(),
-                    1 if is_correct else 0,
-                    datetime.now().isoformat(),
-                    1 if is_correct else 0,
-                ),
+                rows,
             )
 
     def get_test_history(self, memory_id: str) -> Optional[Dict[str, Any]]:
         """Get test history for a memory"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute(
-                "SELECT * FROM test_history WHERE memory_id = ?", (memory_id,)
-            )
-            row = cursor.fetchone()
-            return dict(row) if row else None
+        row = self._conn.execute(
+            "SELECT * FROM test_history WHERE memory_id = ?", (memory_id,)
+        ).fetchone()
+        return dict(row) if row else None
 
-    def is_ready_for_test(self, memory_id: str) -> bool:
-        """Check if memory is ready for testing"""
+    def is_ready_for_test(self, memory_id: str, now: Optional[int] = None) -> bool:
+        """
+        Check if memory is ready for testing. Callers checking many memories
+        can pass a single `now` (unix seconds) rather than reading the clock per memory.
+        """
         history = self.get_test_history(memory_id)
         if not history:
             return True
 
-        last_tested = datetime.fromisoformat(history["last_tested"])
-        interval = timedelta(hours=4)  # Simple fixed interval for now
-        return datetime.now() >= last_tested + interval
+        now = int(time.time()) if now is None else now
+        return now - history["last_tested"] >= TEST_INTERVAL_SECONDS
+
+    def filter_ready(
+        self, memory_ids: List[str], now: Optional[int] = None
+    ) -> Set[str]:
+        """Return the memories that are ready for testing, looked up in bulk"""
+        now = int(time.time()) if now is None else now
+        # Only memories tested within the interval are not ready, so fetch just those
+        ready = set(memory_ids)
+        for start in range(0, len(memory_ids), _MAX_IN_PARAMS):
+            chunk = memory_ids[start : start + _MAX_IN_PARAMS]
+            placeholders = ", ".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT memory_id FROM test_history WHERE memory_id IN ({placeholders}) AND last_tested > ?",
+                [*chunk, now - TEST_INTERVAL_SECONDS],
+            )
+            ready.difference_update(row["memory_id"] for row in rows)
+        return ready
+
+    def close(self) -> None:
+        self._conn.close()
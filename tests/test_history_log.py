@@ -0,0 +1,47 @@
+from history_log import HistoryLog
+
+
+def test_append_and_load_round_trip(tmp_path):
+    log = HistoryLog("student", log_dir=str(tmp_path))
+    log.append("user", "What is a p-value?")
+    log.append("assistant", 'It is "the probability" of data at least this extreme.\n')
+    log.close()
+
+    assert HistoryLog("student", log_dir=str(tmp_path)).load() == [
+        {"role": "user", "content": "What is a p-value?"},
+        {
+            "role": "assistant",
+            "content": 'It is "the probability" of data at least this extreme.\n',
+        },
+    ]
+
+
+def test_load_keeps_the_most_recent_messages(tmp_path):
+    log = HistoryLog("student", log_dir=str(tmp_path))
+    for i in range(10):
+        log.append("user", f"message {i}")
+
+    assert [message["content"] for message in log.load(limit=3)] == [
+        "message 7",
+        "message 8",
+        "message 9",
+    ]
+    assert len(log.load()) == 10
+    log.close()
+
+
+def test_logs_are_per_user_and_append_across_sessions(tmp_path):
+    first = HistoryLog("student", log_dir=str(tmp_path))
+    first.append("user", "first session")
+    first.close()
+    other = HistoryLog("other", log_dir=str(tmp_path))
+    other.append("user", "someone else")
+    other.close()
+
+    second = HistoryLog("student", log_dir=str(tmp_path))
+    second.append("user", "second session")
+    assert [message["content"] for message in second.load()] == [
+        "first session",
+        "second session",
+    ]
+    second.close()
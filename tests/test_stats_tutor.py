@@ -0,0 +1,117 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import mem0
+import pytest
+
+from history_log import HistoryLog
+import stats_tutor
+from stats_tutor import HISTORY_WINDOW, StatsTutor
+
+USER_ID = "student"
+
+
+class FakeMemoryClient:
+    """Stands in for Mem0's client, which checks the API key over the network"""
+
+    def __init__(self, api_key=None):
+        self.async_client = httpx.AsyncClient()
+        self.sync_client = SimpleNamespace(client=httpx.Client())
+
+    async def search(self, query, **kwargs):
+        return []
+
+
+@pytest.fixture
+def tutor(tmp_path, monkeypatch):
+    # The tracker database and history logs are created relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(mem0, "AsyncMemoryClient", FakeMemoryClient)
+    tutor = StatsTutor()
+    yield tutor
+    asyncio.run(tutor.close())
+
+
+def test_restore_history_resumes_the_latest_turns(tutor):
+    log = HistoryLog(USER_ID)
+    for i in range(HISTORY_WINDOW + 4):
+        log.append("user" if i % 2 == 0 else "assistant", f"message {i}")
+    log.close()
+
+    tutor.restore_history(USER_ID)
+
+    assert [message["content"] for message in tutor.message_history] == [
+        f"message {i}" for i in range(4, HISTORY_WINDOW + 4)
+    ]
+    assert tutor._history_tokens > 0
+
+
+def test_restore_history_without_a_log(tutor):
+    tutor.restore_history(USER_ID)
+    assert not tutor.message_history
+
+
+async def _stream(content):
+    yield SimpleNamespace(
+        choices=[
+            SimpleNamespace(
+                delta=SimpleNamespace(content=content), finish_reason="stop"
+            )
+        ]
+    )
+
+
+def test_every_earlier_turn_is_sent_or_summarized(tutor):
+    prompts = []
+
+    async def chat(**kwargs):
+        messages = kwargs["messages"]
+        if kwargs.get("stream"):
+            prompts.append(messages)
+            reply = {
+                "is_testable_topic": False,
+                "response": f"answer {len(prompts) - 1}.",
+                "reason": "",
+            }
+            return _stream(json.dumps(reply))
+        # The stub summary keeps the whole transcript it was given
+        return SimpleNamespace(
+            choices=[
+                SimpleNamespace(
+                    message=SimpleNamespace(content=messages[-1]["content"])
+                )
+            ]
+        )
+
+    tutor._chat = chat
+
+    async def run():
+        for turn in range(3 * HISTORY_WINDOW):
+            await tutor.handle_interaction(f"question {turn}?", USER_ID)
+            if tutor._compaction:
+                await tutor._compaction
+
+    asyncio.run(run())
+    assert tutor._summary
+
+    # The summary is sent as a system message, so it is part of each prompt
+    for turn, prompt in enumerate(prompts):
+        sent = "\n".join(str(message["content"]) for message in prompt)
+        for earlier in range(turn):
+            assert f"question {earlier}?" in sent
+            assert f"answer {earlier}." in sent
+
+
+def test_slow_recall_is_skipped(tutor, monkeypatch):
+    monkeypatch.setattr(stats_tutor, "RECALL_TIMEOUT_SECONDS", 0.01)
+
+    async def slow_search(query, **kwargs):
+        await asyncio.sleep(1)
+        return [{"memory": "never used"}]
+
+    tutor.memory.search = slow_search
+
+    assert asyncio.run(tutor._recall("What is a p-value?", USER_ID)) == []
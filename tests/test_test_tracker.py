@@ -0,0 +1,121 @@
+import sqlite3
+import time
+from datetime import datetime
+
+import pytest
+
+# Imported under another name so pytest doesn't try to collect it as a test class
+from test_tracker import TEST_INTERVAL_SECONDS, TestTracker as Tracker
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    tracker = Tracker(str(tmp_path / "test_history.db"))
+    yield tracker
+    tracker.close()
+
+
+@pytest.fixture
+def local_timezone(monkeypatch):
+    """Run in a timezone with a UTC offset so local/UTC mix-ups show up"""
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_migrates_iso_text_timestamps_to_unix_seconds(tmp_path, local_timezone):
+    db_path = str(tmp_path / "test_history.db")
+    tested_at = datetime(2024, 7, 1, 9, 30, 15, 123456)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE test_history (
+                memory_id TEXT PRIMARY KEY,
+                last_tested TEXT,
+                correct_count INTEGER DEFAULT 0,
+                total_tests INTEGER DEFAULT 0
+            )
+        """)
+        conn.execute(
+            "INSERT INTO test_history VALUES (?, ?, ?, ?)",
+            ("m1", tested_at.isoformat(), 2, 3),
+        )
+    conn.close()
+
+    tracker = Tracker(db_path)
+    try:
+        # The old column held naive local times written by datetime.now()
+        assert tracker.get_test_history("m1") == {
+            "memory_id": "m1",
+            "last_tested": int(tested_at.timestamp()),
+            "correct_count": 2,
+            "total_tests": 3,
+        }
+        columns = {
+            row["name"]: row["type"]
+            for row in tracker._conn.execute("PRAGMA table_info(test_history)")
+        }
+        assert columns["last_tested"] == "INTEGER"
+    finally:
+        tracker.close()
+
+    # Reopening a migrated database leaves it untouched
+    tracker = Tracker(db_path)
+    try:
+        history = tracker.get_test_history("m1")
+        assert history["last_tested"] == int(tested_at.timestamp())
+    finally:
+        tracker.close()
+
+
+def test_record_tests_upserts_counters(tracker):
+    tracker.record_test("m1", True)
+    tracker.record_tests([("m1", False), ("m2", False), ("m1", True)])
+
+    m1 = tracker.get_test_history("m1")
+    assert (m1["correct_count"], m1["total_tests"]) == (2, 3)
+    m2 = tracker.get_test_history("m2")
+    assert (m2["correct_count"], m2["total_tests"]) == (0, 1)
+    assert abs(m1["last_tested"] - time.time()) < 5
+
+
+def test_record_tests_with_no_results(tracker):
+    tracker.record_tests([])
+    assert tracker.get_test_history("m1") is None
+
+
+def test_filter_ready_across_chunk_boundary(tracker):
+    memory_ids = [f"m{i}" for i in range(1200)]
+    # Tested ids fall on both sides of each 500-id chunk boundary
+    recently_tested = {"m0", "m499", "m500", "m501", "m999", "m1000", "m1199"}
+    tracker.record_tests((memory_id, True) for memory_id in recently_tested)
+    now = int(time.time())
+
+    assert tracker.filter_ready(memory_ids, now=now) == (
+        set(memory_ids) - recently_tested
+    )
+    assert tracker.filter_ready(memory_ids, now=now + TEST_INTERVAL_SECONDS) == set(
+        memory_ids
+    )
+    assert tracker.filter_ready([], now=now) == set()
+
+
+def test_is_ready_for_test(tracker):
+    tracker.record_test("m1", True)
+    now = int(time.time())
+
+    assert tracker.is_ready_for_test("untested", now=now)
+    assert not tracker.is_ready_for_test("m1", now=now)
+    assert tracker.is_ready_for_test("m1", now=now + TEST_INTERVAL_SECONDS)
+
+
+def test_ready_memories_view(tracker):
+    tracker.record_tests([("recent", True), ("stale", False)])
+    tracker._conn.execute(
+        "UPDATE test_history SET last_tested = last_tested - ? WHERE memory_id = 'stale'",
+        (TEST_INTERVAL_SECONDS,),
+    )
+
+    rows = tracker._conn.execute("SELECT memory_id FROM ready_memories").fetchall()
+    assert [row["memory_id"] for row in rows] == ["stale"]